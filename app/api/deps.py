@@ -8,6 +8,8 @@ from app.services.ocr_service import OcrService, get_ocr_service
 from app.services.groq_service import GroqService, get_groq_service
 from app.services.scan_service import ScanService
 from app.services.image_service import ImagePreprocessor
+from app.services.duplicate_service import DuplicateIndex, get_duplicate_index
+from app.services.scan_scheduler import ScanScheduler, get_scan_scheduler
 
 
 @lru_cache
@@ -15,10 +17,10 @@ def get_settings() -> Settings:
   return Settings()
 
 
-def get_ocr(  # Dependency for routes
-  settings: Annotated[Settings, Depends(get_settings)]
-) -> OcrService:
-  return get_ocr_service(settings)
+@lru_cache
+def get_ocr() -> OcrService:
+  # Loading PaddleOCR is expensive; build the model once per process.
+  return get_ocr_service(get_settings())
 
 
 def get_groq(
@@ -27,9 +29,28 @@ def get_groq(
   return get_groq_service(settings)
 
 
+@lru_cache
+def get_duplicates() -> DuplicateIndex:
+  # Shared across requests so earlier scans stay searchable.
+  return get_duplicate_index(get_settings())
+
+
+@lru_cache
+def get_scheduler() -> ScanScheduler:
+  # Single queue per process so all /scan callers compete through it.
+  return get_scan_scheduler(get_settings())
+
+
 def get_scan(
   settings: Annotated[Settings, Depends(get_settings)],
   ocr: Annotated[OcrService, Depends(get_ocr)],
   groq: Annotated[GroqService, Depends(get_groq)],
+  duplicates: Annotated[DuplicateIndex, Depends(get_duplicates)],
 ) -> ScanService:
-  return ScanService(settings=settings, ocr_service=ocr, groq_service=groq, preprocessor=ImagePreprocessor())
+  return ScanService(
+    settings=settings,
+    ocr_service=ocr,
+    groq_service=groq,
+    preprocessor=ImagePreprocessor(),
+    duplicate_index=duplicates,
+  )
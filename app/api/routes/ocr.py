@@ -1,6 +1,9 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from app.api.deps import get_ocr
+from app.api.deps import get_ocr, get_scheduler
 from app.services.ocr_service import OcrService
+from app.services.scan_scheduler import ScanDropped, ScanScheduler
 
 router = APIRouter()
 
@@ -9,6 +12,7 @@ router = APIRouter()
 async def run_ocr(
   image: UploadFile = File(...),
   ocr_service: OcrService = Depends(get_ocr),
+  scheduler: ScanScheduler = Depends(get_scheduler),
 ):
   if not image.content_type or not image.content_type.startswith("image/"):
     raise HTTPException(status_code=400, detail="File harus bertipe gambar.")
@@ -17,5 +21,10 @@ async def run_ocr(
   if not content:
     raise HTTPException(status_code=400, detail="File kosong.")
 
-  result = ocr_service.extract(content)
+  # Shares the OCR engine with /scan, so it waits in the same queue instead of blocking
+  # the event loop on the OCR lock.
+  try:
+    result = await scheduler.submit(lambda: asyncio.to_thread(ocr_service.extract, content), priority="interactive")
+  except ScanDropped as exc:
+    raise HTTPException(status_code=503, detail=str(exc))
   return result
@@ -4,8 +4,9 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 
-from app.api.deps import get_scan, get_settings
+from app.api.deps import get_scan, get_scheduler, get_settings
 from app.core.config import Settings
+from app.services.scan_scheduler import PRIORITY_CLASSES, ScanDropped, ScanScheduler
 from app.services.scan_service import ScanService
 
 router = APIRouter()
@@ -16,26 +17,45 @@ logger = logging.getLogger(__name__)
 async def scan(
   image: UploadFile = File(...),
   needs_llm: bool = Form(False),
+  phone: str = Form(""),
+  priority: str = Form("interactive"),
   scan_service: ScanService = Depends(get_scan),
+  scheduler: ScanScheduler = Depends(get_scheduler),
 ):
   if not image.content_type or not image.content_type.startswith("image/"):
     raise HTTPException(status_code=400, detail="File harus bertipe gambar.")
 
+  if priority not in PRIORITY_CLASSES:
+    raise HTTPException(
+      status_code=400, detail=f"Prioritas harus salah satu dari: {', '.join(PRIORITY_CLASSES)}."
+    )
+
   content = await image.read()
   if not content:
     raise HTTPException(status_code=400, detail="File kosong.")
 
   try:
-    result = await scan_service.run_scan(content, mime=image.content_type, needs_llm=needs_llm)
+    result = await scheduler.submit(
+      lambda: scan_service.run_scan(content, mime=image.content_type, needs_llm=needs_llm, phone=phone),
+      phone=phone,
+      priority=priority,
+    )
     return result
   except HTTPException:
     raise
+  except ScanDropped as exc:
+    raise HTTPException(status_code=503, detail=str(exc))
   except Exception as exc:
     logger.exception("Scan gagal diproses")
     message = str(exc) or exc.__class__.__name__
     raise HTTPException(status_code=500, detail=message)
 
 
+@router.get("/scan/metrics")
+async def scan_metrics(scheduler: ScanScheduler = Depends(get_scheduler)):
+  return scheduler.metrics()
+
+
 def _gather_outputs(settings: Settings):
   out_dir = Path(settings.output_dir)
   files = []
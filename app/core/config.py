@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -11,11 +13,27 @@ class Settings(BaseSettings):
   ocr_use_angle_cls: bool = Field(True, env="OCR_USE_ANGLE_CLS")
   ocr_version: str = Field("PP-OCRv4", env="OCR_VERSION")
   output_dir: str = Field("output", env="OUTPUT_DIR")
+  # Parsed rows per scan (owner phone + transactions); kept out of the served OUTPUT_DIR
+  records_dir: str = Field("records", env="RECORDS_DIR")
   groq_api_key: str = Field("", env="GROQ_API_KEY")
   groq_model: str = Field("llama-3.1-8b-instant", env="GROQ_MODEL")
   groq_fallback_model: str = Field("mixtral-8x7b-32768", env="GROQ_FALLBACK_MODEL")
   groq_enable_fallback: bool = Field(True, env="GROQ_ENABLE_FALLBACK")
   groq_url: str = Field("https://api.groq.com/openai/v1/chat/completions", env="GROQ_URL")
+  # Near-duplicate photo detection: dHash distance (of 64 bits) nominates, OCR text confirms
+  duplicate_detection_enabled: bool = Field(True, env="DUPLICATE_DETECTION_ENABLED")
+  duplicate_max_distance: int = Field(16, env="DUPLICATE_MAX_DISTANCE")
+  duplicate_min_text_similarity: float = Field(0.9, env="DUPLICATE_MIN_TEXT_SIMILARITY")
+  duplicate_max_entries: int = Field(1000, env="DUPLICATE_MAX_ENTRIES")
+  # Scan scheduling: interactive scans always run before batch (backfill) scans
+  # OCR itself runs one image at a time; more slots let Groq round-trips overlap it.
+  scan_max_concurrency: int = Field(4, env="SCAN_MAX_CONCURRENCY")
+  scan_interactive_deadline_s: float = Field(60, env="SCAN_INTERACTIVE_DEADLINE_S")
+  scan_batch_deadline_s: float = Field(3600, env="SCAN_BATCH_DEADLINE_S")
+  scan_interactive_max_queue: int = Field(32, env="SCAN_INTERACTIVE_MAX_QUEUE")
+  scan_batch_max_queue: int = Field(8, env="SCAN_BATCH_MAX_QUEUE")
+  # JSON object of phone -> fair-queuing weight, e.g. {"081234567890": 2}; default weight is 1
+  scan_shop_weights: Dict[str, float] = Field({}, env="SCAN_SHOP_WEIGHTS")
 
   class Config:
     env_file = ".env"
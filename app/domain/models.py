@@ -27,6 +27,47 @@ class Detection(BaseModel):
   box: list
 
 
+class ParsedRecord(BaseModel):
+  scan_id: str
+  phone: str = ""
+  used_llm: bool = False
+  duplicate_of: Optional[str] = None
+  parsed_at: str
+  rows: List[ParsedRow]
+
+
+class LayoutCell(BaseModel):
+  index: int
+  text: str
+  x_min: float
+  x_max: float
+  y_min: float
+  y_max: float
+  column: Optional[int] = None
+
+
+class LayoutColumn(BaseModel):
+  index: int
+  x_min: float
+  x_max: float
+  role: Optional[str] = None
+
+
+class LayoutRow(BaseModel):
+  index: int
+  text: str
+  cells: List[LayoutCell]
+
+
+class LayoutResult(BaseModel):
+  rows: List[LayoutRow] = []
+  columns: List[LayoutColumn] = []
+
+  @property
+  def lines(self) -> List[str]:
+    return [row.text for row in self.rows]
+
+
 class ScanResult(BaseModel):
   lines: List[str]
   parsed: List[ParsedRow]
@@ -37,3 +78,8 @@ class ScanResult(BaseModel):
   image_height: Optional[int] = None
   detection_text_path: Optional[str] = None
   detection_json_path: Optional[str] = None
+  parsed_json_path: Optional[str] = None
+  layout: Optional[LayoutResult] = None
+  image_hash: Optional[str] = None
+  duplicate_of: Optional[str] = None
+  duplicate_distance: Optional[int] = None
@@ -0,0 +1,206 @@
+import io
+import re
+from collections import Counter, OrderedDict
+from difflib import SequenceMatcher
+from itertools import combinations
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+from app.core.config import Settings
+from app.domain.models import ScanResult
+
+HASH_BITS = 64
+
+
+def dhash(image_bytes: bytes, hash_size: int = 8) -> int:
+  """
+  Difference hash: compares neighbouring pixels of a tiny grayscale thumbnail, so slight
+  re-framing, rescaling, or JPEG noise keeps most bits stable.
+  """
+  image = Image.open(io.BytesIO(image_bytes)).convert("L")
+  image = image.resize((hash_size + 1, hash_size), Image.LANCZOS)
+  pixels = list(image.getdata())
+
+  value = 0
+  for row in range(hash_size):
+    offset = row * (hash_size + 1)
+    for col in range(hash_size):
+      value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+  return value
+
+
+def hamming(a: int, b: int) -> int:
+  return (a ^ b).bit_count()
+
+
+# Letters OCR reads in place of digits; undone inside tokens that already hold a digit.
+DIGIT_LOOKALIKES = str.maketrans({"O": "0", "o": "0", "D": "0", "l": "1", "I": "1", "S": "5", "B": "8", "Z": "2", "b": "6", "g": "9"})
+
+
+def _amounts(lines: List[str]) -> Counter:
+  amounts: Counter = Counter()
+  for line in lines:
+    for token in line.split():
+      if re.search(r"\d", token):
+        digits = re.sub(r"\D", "", token.translate(DIGIT_LOOKALIKES))
+        if len(digits) >= 3:
+          amounts[digits] += 1
+  return amounts
+
+
+def same_page(lines_a: List[str], lines_b: List[str], min_similarity: float) -> bool:
+  """
+  Confirm a hash candidate from OCR text: every amount-like number must match and the
+  sorted, normalised lines must be near-identical. A different page in the same ledger
+  layout hashes close but fails here because its rows (and numbers) differ.
+  """
+  if _amounts(lines_a) != _amounts(lines_b):
+    return False
+  text_a = "\n".join(sorted(" ".join(line.lower().split()) for line in lines_a))
+  text_b = "\n".join(sorted(" ".join(line.lower().split()) for line in lines_b))
+  return SequenceMatcher(None, text_a, text_b, autojunk=False).ratio() >= min_similarity
+
+
+class MultiIndexHash:
+  """
+  Hamming-radius search over 64-bit hashes via multi-index hashing.
+
+  Each hash is split into `chunks` substrings, each with its own exact-match table. If two
+  hashes differ in at most r bits, some substring differs in at most r // chunks bits, so a
+  query only probes substrings within that small radius and verifies the candidates.
+  """
+
+  def __init__(self, max_distance: int, chunks: int = 4) -> None:
+    self.max_distance = max_distance
+    self._chunks = chunks
+    self._chunk_bits = HASH_BITS // chunks
+    self._chunk_mask = (1 << self._chunk_bits) - 1
+    self._tables: List[Dict[int, List[int]]] = [{} for _ in range(chunks)]
+    self._hashes: set[int] = set()
+
+    radius = max_distance // chunks
+    self._probes: List[int] = []
+    for flips in range(radius + 1):
+      for bits in combinations(range(self._chunk_bits), flips):
+        mask = 0
+        for bit in bits:
+          mask |= 1 << bit
+        self._probes.append(mask)
+
+  def __len__(self) -> int:
+    return len(self._hashes)
+
+  def _split(self, value: int) -> List[int]:
+    return [(value >> (i * self._chunk_bits)) & self._chunk_mask for i in range(self._chunks)]
+
+  def add(self, value: int) -> None:
+    if value in self._hashes:
+      return
+    self._hashes.add(value)
+    for table, chunk in zip(self._tables, self._split(value)):
+      table.setdefault(chunk, []).append(value)
+
+  def remove(self, value: int) -> None:
+    if value not in self._hashes:
+      return
+    self._hashes.discard(value)
+    for table, chunk in zip(self._tables, self._split(value)):
+      bucket = table[chunk]
+      bucket.remove(value)
+      if not bucket:
+        del table[chunk]
+
+  def search(self, value: int) -> List[Tuple[int, int]]:
+    """
+    Return (hash, distance) pairs within `max_distance`, closest first.
+    """
+    matches: List[Tuple[int, int]] = []
+    seen: set[int] = set()
+    for table, chunk in zip(self._tables, self._split(value)):
+      for probe in self._probes:
+        for candidate in table.get(chunk ^ probe, ()):
+          if candidate in seen:
+            continue
+          seen.add(candidate)
+          distance = hamming(candidate, value)
+          if distance <= self.max_distance:
+            matches.append((candidate, distance))
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+class DuplicateIndex:
+  """
+  Per-shop perceptual-hash index of past scans, keyed by scan id. Hashes only nominate
+  candidates; callers confirm them with `same_page` on the new OCR text. Different pages
+  may share a hash, so every scan keeps its own entry and a hash leaves the search index
+  only when its last scan is evicted. Entries share one LRU of `max_entries`.
+  """
+
+  def __init__(self, max_distance: int = 16, max_entries: int = 1000) -> None:
+    self._max_distance = max_distance
+    self._max_entries = max_entries
+    self._indexes: Dict[str, MultiIndexHash] = {}
+    # (shop, scan_id) -> (hash, result), oldest first
+    self._results: "OrderedDict[Tuple[str, str], Tuple[int, ScanResult]]" = OrderedDict()
+    # (shop, hash) -> scan ids with that hash, oldest first
+    self._scans_by_hash: Dict[Tuple[str, int], List[str]] = {}
+    self._lock = Lock()
+
+  def __len__(self) -> int:
+    return len(self._results)
+
+  def candidates(self, shop: str, value: int) -> List[Tuple[str, int, ScanResult]]:
+    """
+    Return (scan_id, distance, previous_result) for this shop's near hashes, closest first
+    and most recent first among scans with the same hash.
+    """
+    with self._lock:
+      index = self._indexes.get(shop)
+      if index is None:
+        return []
+      matches = []
+      for matched, distance in index.search(value):
+        for scan_id in reversed(self._scans_by_hash[(shop, matched)]):
+          matches.append((scan_id, distance, self._results[(shop, scan_id)][1]))
+      return matches
+
+  def touch(self, shop: str, scan_id: str) -> None:
+    with self._lock:
+      if (shop, scan_id) in self._results:
+        self._results.move_to_end((shop, scan_id))
+
+  def add(self, shop: str, scan_id: str, value: int, result: ScanResult) -> None:
+    with self._lock:
+      if (shop, scan_id) in self._results:
+        self._remove(shop, scan_id)
+      index = self._indexes.get(shop)
+      if index is None:
+        index = self._indexes[shop] = MultiIndexHash(self._max_distance)
+      index.add(value)
+      self._scans_by_hash.setdefault((shop, value), []).append(scan_id)
+      self._results[(shop, scan_id)] = (value, result)
+
+      while len(self._results) > self._max_entries:
+        old_shop, old_scan_id = next(iter(self._results))
+        self._remove(old_shop, old_scan_id)
+
+  def _remove(self, shop: str, scan_id: str) -> None:
+    value, _ = self._results.pop((shop, scan_id))
+    scan_ids = self._scans_by_hash[(shop, value)]
+    scan_ids.remove(scan_id)
+    if scan_ids:
+      return
+    del self._scans_by_hash[(shop, value)]
+    index = self._indexes[shop]
+    index.remove(value)
+    if not len(index):
+      del self._indexes[shop]
+
+
+def get_duplicate_index(settings: Settings) -> DuplicateIndex:
+  return DuplicateIndex(
+    max_distance=settings.duplicate_max_distance, max_entries=settings.duplicate_max_entries
+  )
@@ -0,0 +1,198 @@
+import math
+import re
+from statistics import median
+from typing import Dict, List, Optional
+
+from app.domain.models import LayoutCell, LayoutColumn, LayoutResult, LayoutRow, OcrResult
+
+# Header keywords (lowercase) mapped to the column role they announce.
+HEADER_ROLES: Dict[str, str] = {
+  "no": "index",
+  "no.": "index",
+  "nomor": "index",
+  "qty": "qty",
+  "jml": "qty",
+  "banyak": "qty",
+  "kuantitas": "qty",
+  "harga": "price",
+  "harga(rp)": "price",
+  "price": "price",
+  "@": "price",
+  "total": "total",
+  "subtotal": "total",
+  "barang": "item",
+  "bahan": "item",
+  "item": "item",
+  "produk": "item",
+  "keterangan": "item",
+}
+
+numeric_regex = re.compile(r"^[-–—]?\s*(rp\.?)?\s*[\d][\d.,]*\s*(k|rb|ribu)?$", re.IGNORECASE)
+alpha_regex = re.compile(r"[^\W\d_]")
+
+
+def _skew_angle(boxes: List[list]) -> float:
+  # Median slope of the top edges; PaddleOCR orders points clockwise from top-left.
+  angles = []
+  for box in boxes:
+    (x0, y0), (x1, y1) = box[0][:2], box[1][:2]
+    if x1 - x0 > 0:
+      angles.append(math.atan2(float(y1) - float(y0), float(x1) - float(x0)))
+  return median(angles) if angles else 0.0
+
+
+def _cell_from_box(index: int, text: str, box: list, angle: float) -> LayoutCell:
+  # Rotate by -angle so rows of a tilted photo line up horizontally.
+  cos, sin = math.cos(angle), math.sin(angle)
+  xs = [float(p[0]) * cos + float(p[1]) * sin for p in box]
+  ys = [float(p[1]) * cos - float(p[0]) * sin for p in box]
+  return LayoutCell(index=index, text=text, x_min=min(xs), x_max=max(xs), y_min=min(ys), y_max=max(ys))
+
+
+def _is_numeric(text: str) -> bool:
+  return bool(numeric_regex.match(text.strip()))
+
+
+def _header_role(text: str) -> Optional[str]:
+  normalized = text.strip().lower()
+  if normalized in HEADER_ROLES:
+    return HEADER_ROLES[normalized]
+  for token in re.split(r"\s+", normalized):
+    if token in HEADER_ROLES and HEADER_ROLES[token] != "index":
+      return HEADER_ROLES[token]
+  return None
+
+
+def _group_rows(cells: List[LayoutCell], overlap_ratio: float) -> List[List[LayoutCell]]:
+  """
+  Sweep top-to-bottom over y-centers; a cell joins the open row when its y-range overlaps
+  the row's average band by at least `overlap_ratio` of the smaller height.
+  """
+  ordered = sorted(cells, key=lambda c: (c.y_min + c.y_max) / 2)
+
+  rows: List[List[LayoutCell]] = []
+  band_top = band_bottom = 0.0
+  for cell in ordered:
+    if rows:
+      overlap = min(band_bottom, cell.y_max) - max(band_top, cell.y_min)
+      smaller = max(min(band_bottom - band_top, cell.y_max - cell.y_min), 1.0)
+      if overlap / smaller >= overlap_ratio:
+        row = rows[-1]
+        row.append(cell)
+        count = len(row)
+        band_top += (cell.y_min - band_top) / count
+        band_bottom += (cell.y_max - band_bottom) / count
+        continue
+    rows.append([cell])
+    band_top, band_bottom = cell.y_min, cell.y_max
+
+  for row in rows:
+    row.sort(key=lambda c: c.x_min)
+  return rows
+
+
+def _detect_columns(rows: List[List[LayoutCell]]) -> List[LayoutColumn]:
+  """
+  Merge overlapping x-intervals of cells from multi-cell rows into column bands.
+  Single-cell rows (titles, notes) are skipped so they do not bridge columns.
+  """
+  intervals = sorted((c.x_min, c.x_max) for row in rows if len(row) > 1 for c in row)
+
+  columns: List[LayoutColumn] = []
+  for x_min, x_max in intervals:
+    if columns and x_min <= columns[-1].x_max:
+      columns[-1].x_max = max(columns[-1].x_max, x_max)
+    else:
+      columns.append(LayoutColumn(index=len(columns), x_min=x_min, x_max=x_max))
+  return columns
+
+
+def _assign_column(cell: LayoutCell, columns: List[LayoutColumn]) -> Optional[int]:
+  best = None
+  best_overlap = 0.0
+  for column in columns:
+    overlap = min(cell.x_max, column.x_max) - max(cell.x_min, column.x_min)
+    if overlap > best_overlap:
+      best, best_overlap = column.index, overlap
+  return best
+
+
+def _assign_roles(rows: List[LayoutRow], columns: List[LayoutColumn]) -> None:
+  # Header keywords win; any numeric column left over gets qty/price/total by position and
+  # the wordiest remaining column becomes the item name.
+  for row in rows:
+    if len(row.cells) < 2:
+      continue
+    hits = [(cell, _header_role(cell.text)) for cell in row.cells if cell.column is not None]
+    hits = [(cell, role) for cell, role in hits if role]
+    if not hits:
+      continue
+    for cell, role in hits:
+      column = columns[cell.column]
+      if column.role is None and role not in {c.role for c in columns}:
+        column.role = role
+    break
+
+  numeric_hits = [0] * len(columns)
+  alpha_chars = [0] * len(columns)
+  totals = [0] * len(columns)
+  for row in rows:
+    if len(row.cells) < 2:
+      continue
+    for cell in row.cells:
+      if cell.column is None:
+        continue
+      totals[cell.column] += 1
+      if _is_numeric(cell.text):
+        numeric_hits[cell.column] += 1
+      else:
+        alpha_chars[cell.column] += len(alpha_regex.findall(cell.text))
+
+  taken = {c.role for c in columns if c.role}
+  free_numeric = [
+    c for c in columns
+    if c.role is None and totals[c.index] and numeric_hits[c.index] / totals[c.index] >= 0.5
+  ]
+  if len(free_numeric) == 1:
+    # A lone unlabelled amount column on a receipt is the line amount.
+    order = ["total"]
+  elif len(free_numeric) == 2:
+    order = ["qty", "price"]
+  else:
+    order = ["qty", "price", "total"]
+    free_numeric = free_numeric[-3:]
+
+  roles = [role for role in order if role not in taken]
+  if roles and free_numeric:
+    for column, role in zip(free_numeric[-len(roles):], roles):
+      column.role = role
+
+  if "item" not in taken:
+    candidates = [c for c in columns if c.role is None and alpha_chars[c.index]]
+    if candidates:
+      max(candidates, key=lambda c: alpha_chars[c.index]).role = "item"
+
+
+def build_layout(ocr_result: OcrResult, overlap_ratio: float = 0.5) -> LayoutResult:
+  """
+  Cluster OCR boxes into reading-order rows and column bands with item/qty/price/total hints.
+  Sorting dominates, so this is O(n log n) in the number of boxes.
+  """
+  pairs = [(idx, text, box) for idx, (text, box) in enumerate(zip(ocr_result.lines, ocr_result.boxes)) if box]
+  angle = _skew_angle([box for _, _, box in pairs])
+  cells = [_cell_from_box(idx, text, box, angle) for idx, text, box in pairs]
+  if not cells:
+    return LayoutResult()
+
+  grouped = _group_rows(cells, overlap_ratio)
+  columns = _detect_columns(grouped)
+  for group in grouped:
+    for cell in group:
+      cell.column = _assign_column(cell, columns)
+
+  rows = [
+    LayoutRow(index=idx, text=" ".join(c.text for c in group), cells=group)
+    for idx, group in enumerate(grouped)
+  ]
+  _assign_roles(rows, columns)
+  return LayoutResult(rows=rows, columns=columns)
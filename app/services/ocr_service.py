@@ -1,4 +1,5 @@
 import io
+from threading import Lock
 from typing import List
 
 from paddleocr import PaddleOCR
@@ -30,9 +31,12 @@ class OcrService:
         f"OCR_VERSION tidak valid: '{settings.ocr_version}'. "
         "Gunakan salah satu: PP-OCR, PP-OCRv2, PP-OCRv3, PP-OCRv4."
       ) from exc
+    # One shared PaddleOCR instance is not safe to call from several threads at once.
+    self._lock = Lock()
 
   def extract(self, image_bytes: bytes) -> OcrResult:
-    result: List = self._ocr.ocr(image_bytes, cls=True)
+    with self._lock:
+      result: List = self._ocr.ocr(image_bytes, cls=True)
 
     lines: List[str] = []
     boxes: List[list] = []
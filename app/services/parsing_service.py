@@ -1,7 +1,12 @@
 import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from app.domain.models import ParsedRow
+from app.domain.models import LayoutResult, LayoutRow, ParsedRow
+
+UNITS = {
+  "pcs", "buah", "bh", "biji", "dus", "pak", "pack", "bks", "bungkus", "botol", "btl", "kg", "gr",
+  "liter", "ltr", "sak", "karung", "peti", "lusin", "renceng", "sachet", "ikat", "kaleng",
+}
 
 date_regexes = [
   re.compile(r"\b(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})\b"),
@@ -111,3 +116,122 @@ def parse_lines_rule_based(lines: List[str]) -> List[ParsedRow]:
     )
 
   return rows
+
+
+def _parse_amount(token: str) -> Optional[float]:
+  """
+  Read an Indonesian money/quantity cell: "-Rp40.000" -> 40000, "1,5" -> 1.5, "25rb" -> 25000.
+  A "." followed by exactly three digits is a thousands separator.
+  """
+  cleaned = re.sub(r"^[-–—\s]+", "", token.strip().lower())
+  cleaned = re.sub(r"^rp\.?\s*", "", cleaned)
+  multiplier = 1
+  suffix = re.search(r"\s*(k|rb|ribu)$", cleaned)
+  if suffix:
+    multiplier = 1000
+    cleaned = cleaned[: suffix.start()]
+  cleaned = re.sub(r"\.(?=\d{3}(?!\d))", "", cleaned).replace(",", ".")
+  if not re.fullmatch(r"\d+(\.\d+)?", cleaned):
+    return None
+  return float(cleaned) * multiplier
+
+
+def _looks_like_contact_or_date(text: str) -> bool:
+  stripped = text.strip()
+  if re.fullmatch(r"\+?[\dxX]{3,5}[-\s]?[\dxX]{3,}([-\s][\dxX]{3,})?", stripped) and re.search(r"\d", stripped):
+    return True
+  if _parse_date(stripped) or re.search(r"\b\d{1,2}\s*[A-Za-z]{3,9}\s+\d{4}\b", stripped):
+    return True
+  return False
+
+
+def _split_leading_qty(item: str) -> Tuple[Optional[float], Optional[str], str]:
+  # "2 Dus Air Mineral" -> (2, "dus", "Air Mineral"); "Beras 25kg" is left untouched.
+  match = re.match(r"^(\d+(?:[.,]\d+)?)\s+(.+)$", item)
+  if not match:
+    return None, None, item
+  qty = float(match.group(1).replace(",", "."))
+  rest = match.group(2)
+  head, _, tail = rest.partition(" ")
+  if head.lower() in UNITS and tail:
+    return qty, head.lower(), tail
+  return qty, None, rest
+
+
+def _parse_layout_row(row: LayoutRow, roles: Dict[int, str], detected_date: Optional[str]) -> Optional[ParsedRow]:
+  values: Dict[str, float] = {}
+  item_parts: List[str] = []
+  loose_parts: List[str] = []
+  for cell in row.cells:
+    role = roles.get(cell.column) if cell.column is not None else None
+    if role in ("qty", "price", "total"):
+      num = _parse_amount(cell.text)
+      if num is not None:
+        values[role] = num
+        continue
+    if role == "index" and _parse_number(cell.text) is not None:
+      continue
+    if role == "item":
+      item_parts.append(cell.text)
+    elif not _looks_like_contact_or_date(cell.text):
+      loose_parts.append(cell.text)
+
+  # Other text columns (supplier, address, contact) only stand in when the row has no item cell.
+  item = " ".join(item_parts or loose_parts).strip()
+  if not values or not item:
+    # With amount columns present, a row without an amount cell is an address, note or
+    # header line; token heuristics would only invent prices from its house numbers.
+    if any(role in ("qty", "price", "total") for role in roles.values()):
+      return None
+    return _parse_line(row.text, detected_date)
+
+  qty = values.get("qty")
+  unit = "pcs"
+  if qty is None:
+    qty, leading_unit, item = _split_leading_qty(item)
+    unit = leading_unit or unit
+  price = values.get("price")
+  total = values.get("total")
+  if price is None and total is not None:
+    price = total / qty if qty else total
+  if total is None and price is not None:
+    total = round((qty or 1) * price)
+
+  return ParsedRow(
+    date=detected_date or "",
+    item=item,
+    qty=qty or 1,
+    unit=unit,
+    price=price,
+    total=total,
+    type="penjualan",
+    source="rule",
+  )
+
+
+def parse_layout_rule_based(layout: LayoutResult) -> List[ParsedRow]:
+  """
+  Like `parse_lines_rule_based`, but reads qty/price/total from column hints. Rows with no
+  amount cell are dropped when the table has amount columns; token heuristics on the joined
+  row text are only used for tables without them.
+  """
+  roles = {column.index: column.role for column in layout.columns if column.role}
+  if not roles:
+    return parse_lines_rule_based(layout.lines)
+
+  detected_date = None
+  for line in layout.lines:
+    detected = _parse_date(line)
+    if detected:
+      detected_date = detected
+      break
+
+  rows: List[ParsedRow] = []
+  for row in layout.rows:
+    parsed = _parse_layout_row(row, roles, detected_date)
+    if parsed:
+      rows.append(parsed)
+
+  if not rows:
+    return parse_lines_rule_based(layout.lines)
+  return rows
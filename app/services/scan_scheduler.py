@@ -0,0 +1,257 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+# Strict priority order: a batch job only starts when no interactive job is waiting.
+PRIORITY_CLASSES = ("interactive", "batch")
+
+
+class ScanDropped(RuntimeError):
+  """
+  Raised to the caller when a queued scan passed its deadline before it could start.
+  """
+
+
+class ScanQueueFull(ScanDropped):
+  """
+  Raised when a priority class already has `max_queue` scans waiting.
+  """
+
+
+@dataclass(order=True)
+class _Job:
+  finish_tag: float
+  seq: int
+  start_tag: float = field(compare=False)
+  priority: str = field(compare=False)
+  phone: str = field(compare=False)
+  run: Callable[[], Awaitable[Any]] = field(compare=False)
+  future: asyncio.Future = field(compare=False)
+  enqueued_at: float = field(compare=False)
+  deadline: float = field(compare=False)
+  started: bool = field(default=False, compare=False)
+
+
+class _ClassStats:
+  def __init__(self, window: int) -> None:
+    self.submitted = 0
+    self.completed = 0
+    self.failed = 0
+    self.dropped = 0
+    self.rejected = 0
+    self.wait_ms: Deque[float] = deque(maxlen=window)
+    self.latency_ms: Deque[float] = deque(maxlen=window)
+
+  @staticmethod
+  def _percentile(samples: Deque[float], pct: float) -> Optional[float]:
+    if not samples:
+      return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 2)
+
+  @staticmethod
+  def _rate(part: int, whole: int) -> Optional[float]:
+    return round(part / whole, 4) if whole else None
+
+  def snapshot(self, queued: int) -> Dict[str, Any]:
+    # Dropped jobs count in the wait percentiles at the time they waited; the rates show
+    # how much of the load never ran at all.
+    return {
+      "queued": queued,
+      "submitted": self.submitted,
+      "completed": self.completed,
+      "failed": self.failed,
+      "dropped": self.dropped,
+      "rejected": self.rejected,
+      "drop_rate": self._rate(self.dropped, self.submitted),
+      "reject_rate": self._rate(self.rejected, self.submitted + self.rejected),
+      "wait_ms_p50": self._percentile(self.wait_ms, 0.5),
+      "wait_ms_p95": self._percentile(self.wait_ms, 0.95),
+      "latency_ms_p50": self._percentile(self.latency_ms, 0.5),
+      "latency_ms_p95": self._percentile(self.latency_ms, 0.95),
+    }
+
+
+class ScanScheduler:
+  """
+  Admission queue in front of ScanService.
+
+  Classes are served in strict priority order. Within a class, shops (keyed by `phone`)
+  share capacity by weighted fair queuing: each job gets a virtual finish tag of
+  max(class virtual time, shop's last finish tag) + 1 / weight, and the smallest tag runs
+  first, so one shop's bulk backfill cannot starve another. A caller whose job is still
+  queued at its deadline gets ScanDropped right away and the job is discarded; a class
+  with `max_queue` jobs waiting rejects new ones with ScanQueueFull.
+  """
+
+  def __init__(
+    self,
+    max_concurrency: int = 4,
+    deadlines: Optional[Dict[str, float]] = None,
+    max_queue: Optional[Dict[str, int]] = None,
+    weights: Optional[Dict[str, float]] = None,
+    metrics_window: int = 1000,
+  ) -> None:
+    self._max_concurrency = max(1, max_concurrency)
+    self._deadlines = deadlines or {}
+    self._max_queue = max_queue or {}
+    self._queues: Dict[str, List[_Job]] = {name: [] for name in PRIORITY_CLASSES}
+    self._virtual_time: Dict[str, float] = {name: 0.0 for name in PRIORITY_CLASSES}
+    self._last_finish: Dict[str, Dict[str, float]] = {name: {} for name in PRIORITY_CLASSES}
+    self._weights: Dict[str, float] = {}
+    for phone, weight in (weights or {}).items():
+      if weight <= 0:
+        raise ValueError(f"Bobot untuk '{phone}' harus lebih dari 0.")
+      self._weights[phone] = weight
+    self._stats = {name: _ClassStats(metrics_window) for name in PRIORITY_CLASSES}
+    self._seq = itertools.count()
+    self._workers: List[asyncio.Task] = []
+    self._wakeup: Optional[asyncio.Event] = None
+
+  async def submit(
+    self,
+    run: Callable[[], Awaitable[Any]],
+    phone: str = "",
+    priority: str = "interactive",
+    deadline_s: Optional[float] = None,
+  ) -> Any:
+    """
+    Queue `run` and wait for its result. Raises ScanDropped if it is still queued at its
+    deadline and ScanQueueFull if the class queue is at capacity.
+    """
+    if priority not in self._queues:
+      raise ValueError(f"Prioritas tidak dikenal: '{priority}'. Gunakan: {', '.join(PRIORITY_CLASSES)}.")
+    self._ensure_workers()
+
+    stats = self._stats[priority]
+    limit = self._max_queue.get(priority)
+    if limit is not None and self._queued(priority) >= limit:
+      stats.rejected += 1
+      raise ScanQueueFull("Antrian scan sedang penuh, silakan coba lagi nanti.")
+
+    now = time.monotonic()
+    timeout = deadline_s if deadline_s is not None else self._deadlines.get(priority)
+    last_finish = self._last_finish[priority]
+    start_tag = max(self._virtual_time[priority], last_finish.get(phone, 0.0))
+    finish_tag = start_tag + 1.0 / self._weights.get(phone, 1.0)
+    last_finish[phone] = finish_tag
+
+    job = _Job(
+      finish_tag=finish_tag,
+      seq=next(self._seq),
+      start_tag=start_tag,
+      priority=priority,
+      phone=phone,
+      run=run,
+      future=asyncio.get_running_loop().create_future(),
+      enqueued_at=now,
+      deadline=now + timeout if timeout else float("inf"),
+    )
+    heapq.heappush(self._queues[priority], job)
+    stats.submitted += 1
+    self._wakeup.set()
+
+    try:
+      return await asyncio.wait_for(asyncio.shield(job.future), timeout if timeout else None)
+    except asyncio.TimeoutError:
+      if job.started or job.future.done():
+        # Already running (or just finished): the deadline only guards queueing time.
+        return await job.future
+      job.future.cancel()
+      stats.dropped += 1
+      stats.wait_ms.append((time.monotonic() - job.enqueued_at) * 1000)
+      raise ScanDropped("Antrian scan melewati batas waktu, silakan coba lagi.") from None
+    except asyncio.CancelledError:
+      # Caller went away (e.g. client disconnected); let the worker skip the job.
+      if not job.started:
+        job.future.cancel()
+      raise
+
+  def metrics(self) -> Dict[str, Any]:
+    return {
+      "max_concurrency": self._max_concurrency,
+      "classes": {
+        name: self._stats[name].snapshot(self._queued(name)) for name in PRIORITY_CLASSES
+      },
+    }
+
+  def _queued(self, priority: str) -> int:
+    queue = self._queues[priority]
+    live = [job for job in queue if not job.future.done()]
+    if len(live) < len(queue) // 2:
+      # Drop cancelled/expired entries so the heap does not grow with dead jobs.
+      heapq.heapify(live)
+      self._queues[priority] = live
+    return len(live)
+
+  def _ensure_workers(self) -> None:
+    if self._wakeup is None:
+      self._wakeup = asyncio.Event()
+    self._workers = [task for task in self._workers if not task.done()]
+    while len(self._workers) < self._max_concurrency:
+      self._workers.append(asyncio.create_task(self._worker()))
+
+  def _next_job(self) -> Optional[_Job]:
+    now = time.monotonic()
+    for name in PRIORITY_CLASSES:
+      queue = self._queues[name]
+      while queue:
+        job = heapq.heappop(queue)
+        self._virtual_time[name] = max(self._virtual_time[name], job.start_tag)
+        if job.future.done() or now > job.deadline:
+          # Expired or abandoned: submit() has already answered (or is about to answer) the caller.
+          continue
+        job.started = True
+        return job
+      if not queue:
+        # Idle class: forget per-shop tags so they do not grow without bound.
+        self._last_finish[name].clear()
+    return None
+
+  async def _worker(self) -> None:
+    while True:
+      job = self._next_job()
+      if job is None:
+        self._wakeup.clear()
+        await self._wakeup.wait()
+        continue
+
+      stats = self._stats[job.priority]
+      started = time.monotonic()
+      stats.wait_ms.append((started - job.enqueued_at) * 1000)
+      try:
+        result = await job.run()
+      except Exception as exc:
+        stats.failed += 1
+        if not job.future.done():
+          job.future.set_exception(exc)
+      else:
+        stats.completed += 1
+        if not job.future.done():
+          job.future.set_result(result)
+      finally:
+        stats.latency_ms.append((time.monotonic() - job.enqueued_at) * 1000)
+
+
+def get_scan_scheduler(settings: Settings) -> ScanScheduler:
+  return ScanScheduler(
+    max_concurrency=settings.scan_max_concurrency,
+    deadlines={
+      "interactive": settings.scan_interactive_deadline_s,
+      "batch": settings.scan_batch_deadline_s,
+    },
+    max_queue={
+      "interactive": settings.scan_interactive_max_queue,
+      "batch": settings.scan_batch_max_queue,
+    },
+    weights=settings.scan_shop_weights,
+  )
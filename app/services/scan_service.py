@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import uuid
@@ -6,10 +7,13 @@ from pathlib import Path
 
 from app.core.config import Settings
 from app.domain.models import Detection, ParsedRow, ScanResult
+from app.services.duplicate_service import DuplicateIndex, dhash, same_page
 from app.services.groq_service import GroqService
 from app.services.image_service import ImagePreprocessor
 from app.services.ocr_service import OcrService
-from app.services.parsing_service import parse_lines_rule_based
+from app.services.layout_service import build_layout
+from app.services.parsing_service import parse_layout_rule_based
+from app.services.scan_store import write_parsed_record
 from app.services.visualization import save_annotated_image
 
 logger = logging.getLogger(__name__)
@@ -17,7 +21,7 @@ logger = logging.getLogger(__name__)
 
 class ScanService:
   """
-  Orchestrates preprocessing, OCR, rule-based parsing, and Groq fallback.
+  Orchestrates preprocessing, OCR, layout grouping, rule-based parsing, and Groq fallback.
   """
 
   def __init__(
@@ -26,18 +30,34 @@ class ScanService:
     ocr_service: OcrService,
     groq_service: GroqService,
     preprocessor: ImagePreprocessor | None = None,
+    duplicate_index: DuplicateIndex | None = None,
   ) -> None:
     self._settings = settings
     self._ocr = ocr_service
     self._groq = groq_service
     self._preprocessor = preprocessor or ImagePreprocessor()
     self._output_dir = settings.output_dir
+    self._records_dir = settings.records_dir
+    self._duplicates = duplicate_index if settings.duplicate_detection_enabled else None
+    self._min_text_similarity = settings.duplicate_min_text_similarity
 
   async def run_scan(
-    self, image_bytes: bytes, mime: str | None = None, needs_llm: bool = False
+    self, image_bytes: bytes, mime: str | None = None, needs_llm: bool = False, phone: str = ""
   ) -> ScanResult:
     processed = self._preprocessor.preprocess(image_bytes)
-    ocr_result = self._ocr.extract(processed)
+
+    # Scans without an owner never share cached results with anyone.
+    image_hash = None
+    candidates = []
+    if self._duplicates is not None and phone:
+      try:
+        image_hash = dhash(processed)
+        candidates = self._duplicates.candidates(phone, image_hash)
+      except Exception as exc:
+        logger.warning("Gagal menghitung hash gambar: %s", exc)
+
+    # Off the event loop so queued /scan requests keep being admitted during OCR.
+    ocr_result = await asyncio.to_thread(self._ocr.extract, processed)
 
     detections = self._build_detections(ocr_result.lines, ocr_result.boxes, ocr_result.scores)
     annotated_path = None
@@ -50,44 +70,89 @@ class ScanService:
     except Exception as exc:
       logger.warning("Gagal membuat gambar anotasi OCR: %s", exc)
 
-    rule_based = parse_lines_rule_based(ocr_result.lines)
-    use_llm = needs_llm or len(rule_based) == 0 or self._should_use_llm(ocr_result.lines)
+    # Group per-box fragments into table rows so "indomie" and "3000" parse together.
+    layout = build_layout(ocr_result)
+    row_lines = layout.lines or ocr_result.lines
+
+    # A close hash is only a candidate: the same ledger layout hashes alike across pages,
+    # so the OCR text has to agree before this counts as a re-photographed page.
+    duplicate = next(
+      (
+        (scan_id, distance, previous)
+        for scan_id, distance, previous in candidates
+        if same_page(ocr_result.lines, previous.lines, self._min_text_similarity)
+      ),
+      None,
+    )
+
+    rule_based = parse_layout_rule_based(layout)
+    reuse = duplicate is not None and not needs_llm
+    use_llm = not reuse and (needs_llm or len(rule_based) == 0 or self._should_use_llm(row_lines))
 
     llm_rows: List[ParsedRow] = []
     if use_llm:
       try:
-        llm_rows = await self._groq.normalize(ocr_result.lines)
+        llm_rows = await self._groq.normalize(row_lines)
       except Exception as exc:
         logger.warning("Groq normalize failed, fallback to rule-based: %s", exc)
 
-    merged = llm_rows if llm_rows else rule_based
     final_rows: List[ParsedRow] = []
-    for row in merged:
-      source = "groq" if llm_rows else (row.source or "rule")
-      final_rows.append(row.copy(update={"source": source}))
+    if reuse:
+      # Same page as before: keep its rows (including any Groq normalisation).
+      final_rows = list(duplicate[2].parsed)
+    else:
+      merged = llm_rows if llm_rows else rule_based
+      for row in merged:
+        source = "groq" if llm_rows else (row.source or "rule")
+        final_rows.append(row.copy(update={"source": source}))
 
     txt_path = None
     json_path = None
+    base_stem = Path(annotated_path).stem if annotated_path else f"scan_{uuid.uuid4().hex}"
     try:
-      base_stem = Path(annotated_path).stem if annotated_path else f"scan_{uuid.uuid4().hex}"
       txt_path, json_path = self._persist_detections_files(
         lines=ocr_result.lines, detections=detections, output_dir=self._output_dir, base_stem=base_stem
       )
     except Exception as exc:
       logger.warning("Gagal menyimpan teks/json OCR: %s", exc)
 
-    return ScanResult(
+    result = ScanResult(
       lines=ocr_result.lines,
       parsed=final_rows,
-      used_llm=len(llm_rows) > 0,
+      used_llm=duplicate[2].used_llm if reuse else len(llm_rows) > 0,
       detections=detections,
       annotated_image_path=annotated_path,
       image_width=image_width,
       image_height=image_height,
       detection_text_path=txt_path,
       detection_json_path=json_path,
+      layout=layout,
     )
 
+    if image_hash is not None:
+      result.image_hash = f"{image_hash:016x}"
+      if duplicate is not None:
+        result.duplicate_of = duplicate[0]
+        result.duplicate_distance = duplicate[1]
+        self._duplicates.touch(phone, duplicate[0])
+      else:
+        self._duplicates.add(phone, base_stem, image_hash, result)
+
+    # Keep the returned rows and their owner so offline re-parses can diff against them.
+    try:
+      result.parsed_json_path = write_parsed_record(
+        records_dir=self._records_dir,
+        base_stem=base_stem,
+        phone=phone,
+        rows=final_rows,
+        used_llm=result.used_llm,
+        duplicate_of=result.duplicate_of,
+      )
+    except Exception as exc:
+      logger.warning("Gagal menyimpan hasil parsing: %s", exc)
+
+    return result
+
   @staticmethod
   def _should_use_llm(lines: List[str]) -> bool:
     """
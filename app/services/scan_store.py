@@ -0,0 +1,46 @@
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from app.domain.models import ParsedRecord, ParsedRow
+
+PARSED_SUFFIX = ".parsed.json"
+
+
+def parsed_record_path(records_dir: str, scan_id: str) -> Path:
+  return Path(records_dir) / f"{scan_id}{PARSED_SUFFIX}"
+
+
+def write_parsed_record(
+  records_dir: str,
+  base_stem: str,
+  phone: str,
+  rows: List[ParsedRow],
+  used_llm: bool,
+  duplicate_of: Optional[str] = None,
+) -> str:
+  """
+  Persist the rows a scan returned, keyed by its detection file stem, so later re-parses
+  can diff against (and replace) exactly what the owner saw. Records hold the owner's
+  phone and transactions, so `records_dir` must not be a publicly served folder.
+  """
+  out_dir = Path(records_dir)
+  out_dir.mkdir(parents=True, exist_ok=True)
+
+  record = ParsedRecord(
+    scan_id=base_stem,
+    phone=phone,
+    used_llm=used_llm,
+    duplicate_of=duplicate_of,
+    parsed_at=datetime.now().isoformat(),
+    rows=rows,
+  )
+  path = parsed_record_path(records_dir, base_stem)
+  path.write_text(record.model_dump_json(indent=2), encoding="utf-8")
+  return str(path)
+
+
+def read_parsed_record(path: Path) -> Optional[ParsedRecord]:
+  if not path.exists():
+    return None
+  return ParsedRecord.model_validate_json(path.read_text(encoding="utf-8"))
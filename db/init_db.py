@@ -5,7 +5,7 @@ from pathlib import Path
 DB_PATH = Path(__file__).resolve().parent.parent / "data.db"
 
 CREATE_TABLE_SQL = """
-CREATE TABLE IF NOT EXISTS Transaction (
+CREATE TABLE IF NOT EXISTS "Transaction" (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   date TEXT NOT NULL,
   item TEXT NOT NULL,
@@ -14,17 +14,26 @@ CREATE TABLE IF NOT EXISTS Transaction (
   price REAL,
   total REAL,
   type TEXT,
-  phone TEXT DEFAULT ''
+  phone TEXT DEFAULT '',
+  scan_id TEXT DEFAULT ''
 );
 """
 
 
 def ensure_phone_column(conn: sqlite3.Connection) -> None:
   # Add phone column if the table already existed without it.
-  cur = conn.execute("PRAGMA table_info(Transaction)")
+  cur = conn.execute('PRAGMA table_info("Transaction")')
   columns = {row[1] for row in cur.fetchall()}
   if "phone" not in columns:
-    conn.execute("ALTER TABLE Transaction ADD COLUMN phone TEXT DEFAULT ''")
+    conn.execute("ALTER TABLE \"Transaction\" ADD COLUMN phone TEXT DEFAULT ''")
+
+
+def ensure_scan_id_column(conn: sqlite3.Connection) -> None:
+  # Rows written by the re-parse pipeline are keyed by the detection file stem.
+  cur = conn.execute('PRAGMA table_info("Transaction")')
+  columns = {row[1] for row in cur.fetchall()}
+  if "scan_id" not in columns:
+    conn.execute("ALTER TABLE \"Transaction\" ADD COLUMN scan_id TEXT DEFAULT ''")
 
 
 def main():
@@ -34,6 +43,7 @@ def main():
     conn.execute("PRAGMA foreign_keys = ON;")
     conn.execute(CREATE_TABLE_SQL)
     ensure_phone_column(conn)
+    ensure_scan_id_column(conn)
     conn.commit()
     print(f"Database ready at {DB_PATH}")
   finally:
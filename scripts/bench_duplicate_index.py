@@ -0,0 +1,101 @@
+"""
+Benchmark near-duplicate lookups against a perceptual-hash index.
+
+Half the queries are the stored hash of a random entry with up to --max-distance bits
+flipped (a re-photo), half are fresh random hashes (a new page). Reported per size:
+lookup time, recall (the re-photo's original hash was among the matches), and how many
+other stored hashes each query nominates. Every such false candidate costs one
+`same_page` text comparison in ScanService. Production indexes hold at most
+DUPLICATE_MAX_ENTRIES scans, so the default run benchmarks that size next to 1M.
+
+Usage (from the repo root):
+  python -m scripts.bench_duplicate_index [--size 1000,1000000] [--queries 1000]
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+from app.core.config import Settings
+from app.services.duplicate_service import HASH_BITS, MultiIndexHash
+
+
+def _flip_bits(value: int, count: int, rng: random.Random) -> int:
+  for bit in rng.sample(range(HASH_BITS), count):
+    value ^= 1 << bit
+  return value
+
+
+def _bench(size: int, queries: int, max_distance: int, rng: random.Random) -> None:
+  stored = [rng.getrandbits(HASH_BITS) for _ in range(size)]
+  index = MultiIndexHash(max_distance)
+
+  started = time.perf_counter()
+  for value in stored:
+    index.add(value)
+  build_s = time.perf_counter() - started
+
+  # (query hash, stored hash it was derived from; None for a fresh page)
+  samples: List[Tuple[int, Optional[int]]] = []
+  for i in range(queries):
+    if i % 2 == 0:
+      original = rng.choice(stored)
+      samples.append((_flip_bits(original, rng.randint(0, max_distance), rng), original))
+    else:
+      samples.append((rng.getrandbits(HASH_BITS), None))
+
+  timings = []
+  found = 0
+  true_candidates = 0
+  false_near: List[int] = []
+  false_fresh: List[int] = []
+  for value, original in samples:
+    started = time.perf_counter()
+    matches = index.search(value)
+    timings.append((time.perf_counter() - started) * 1000)
+
+    matched = {candidate for candidate, _ in matches}
+    if original is None:
+      false_fresh.append(len(matched))
+    else:
+      hit = original in matched
+      found += int(hit)
+      true_candidates += int(hit)
+      false_near.append(len(matched) - int(hit))
+
+  timings.sort()
+  p95 = timings[int(len(timings) * 0.95) - 1]
+  total_candidates = true_candidates + sum(false_near) + sum(false_fresh)
+  precision = true_candidates / total_candidates if total_candidates else 1.0
+  print(
+    f"size {len(index)}: build {build_s:.2f}s, lookup mean {statistics.mean(timings):.3f}ms "
+    f"p95 {p95:.3f}ms max {timings[-1]:.3f}ms"
+  )
+  print(
+    f"  recall {found}/{len(false_near)}, kandidat palsu per query: foto ulang "
+    f"{statistics.mean(false_near):.1f}, halaman baru {statistics.mean(false_fresh):.1f} "
+    f"(maks {max(false_fresh)}), presisi {precision:.1%}"
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument("--size", default=None, help="Jumlah hash, pisahkan dengan koma (default: DUPLICATE_MAX_ENTRIES,1000000).")
+  parser.add_argument("--queries", type=int, default=1000)
+  parser.add_argument("--max-distance", type=int, default=None, help="Default: DUPLICATE_MAX_DISTANCE.")
+  parser.add_argument("--seed", type=int, default=42)
+  args = parser.parse_args()
+
+  settings = Settings()
+  sizes = [int(size) for size in args.size.split(",")] if args.size else [settings.duplicate_max_entries, 1_000_000]
+  max_distance = args.max_distance if args.max_distance is not None else settings.duplicate_max_distance
+  print(f"DUPLICATE_MAX_DISTANCE={max_distance}, DUPLICATE_MAX_ENTRIES={settings.duplicate_max_entries}")
+
+  rng = random.Random(args.seed)
+  for size in sizes:
+    _bench(size, args.queries, max_distance, rng)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,197 @@
+"""
+Check on real scans that duplicate detection separates re-photos from different pages.
+
+For every `annotated_*.jpg` in OUTPUT_DIR with its detection JSON, this builds:
+  - re-photos: small crops, slight rotations, rescaling and JPEG re-encoding. Their OCR text
+    is the original detections with simulated OCR noise at each --char-error rate (look-alike
+    swaps such as 0/O and 1/l, stray characters, lines dropped or merged), or, with --reocr,
+    the text PaddleOCR actually reads from the variant;
+  - same-layout pages: the page with one text-bearing row band (10% of the height) blanked,
+    with the detections inside that band removed to stand in for its OCR text;
+  - other pages: every other sample whose text differs.
+It prints the dHash distances per group and how many would be accepted as duplicates
+(hash within DUPLICATE_MAX_DISTANCE and OCR text confirmed by `same_page`), and how many
+of those accepted pages actually carry different parsed transactions (must be 0). For
+re-photos the accepted share is the recall; "nominal sama" counts the samples whose
+amount-like numbers still matched exactly, which `same_page` requires.
+
+Usage (from the repo root):
+  python -m scripts.check_duplicate_threshold [--output-dir output] [--char-error 0,0.01,0.03] [--reocr]
+"""
+import argparse
+import io
+import json
+import random
+import string
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from app.core.config import Settings
+from app.domain.models import OcrResult
+from app.services.duplicate_service import dhash, hamming, same_page
+from app.services.layout_service import build_layout
+from app.services.parsing_service import parse_layout_rule_based
+
+
+def _jpeg(image: Image.Image) -> bytes:
+  output = io.BytesIO()
+  image.convert("RGB").save(output, format="JPEG", quality=70)
+  return output.getvalue()
+
+
+def _rephotos(image: Image.Image) -> List[Image.Image]:
+  width, height = image.size
+  variants = []
+  for crop in (0.02, 0.04, 0.06):
+    box = (int(width * crop), int(height * crop), int(width * (1 - crop / 2)), int(height * (1 - crop / 2)))
+    variants.append(image.crop(box))
+  for angle in (1.5, -1.5):
+    variants.append(image.rotate(angle, fillcolor="white"))
+  variants.append(image.resize((int(width * 0.8), int(height * 0.8))))
+  return variants
+
+
+# Look-alike characters PaddleOCR commonly swaps on handwritten and thermal-printed notes.
+OCR_CONFUSIONS = {
+  "0": "O", "O": "0", "o": "0", "1": "l", "l": "1", "I": "1", "5": "S", "S": "5",
+  "8": "B", "B": "8", "6": "b", "2": "Z", "9": "g", ".": ",", ",": ".",
+}
+
+
+def _ocr_noise(lines: List[str], rng: random.Random, char_error: float) -> List[str]:
+  """
+  Re-read `lines` the way a second OCR pass might: each character is swapped for a
+  look-alike (or a random letter) at `char_error`, and each line is dropped or merged into
+  the next at half that rate.
+  """
+  noisy: List[str] = []
+  for line in lines:
+    chars = []
+    for char in line:
+      if not char.isspace() and rng.random() < char_error:
+        chars.append(OCR_CONFUSIONS.get(char) or rng.choice(string.ascii_lowercase))
+      else:
+        chars.append(char)
+    text = "".join(chars)
+    roll = rng.random()
+    if roll < char_error / 2:
+      continue
+    if roll < char_error and noisy:
+      noisy[-1] = f"{noisy[-1]} {text}"
+      continue
+    noisy.append(text)
+  return noisy
+
+
+def _transactions(detections: List[dict]) -> List[tuple]:
+  ocr_result = OcrResult(
+    lines=[det["text"] for det in detections],
+    boxes=[det["box"] for det in detections],
+    scores=[det["score"] for det in detections],
+  )
+  return [(row.item, row.qty, row.price, row.total) for row in parse_layout_rule_based(build_layout(ocr_result))]
+
+
+def _blank_band(image: Image.Image, detections: List[dict], top: float) -> Tuple[Image.Image, List[dict]]:
+  width, height = image.size
+  y0, y1 = height * top, height * (top + 0.1)
+  blanked = image.copy()
+  ImageDraw.Draw(blanked).rectangle((0, y0, width, y1), fill="white")
+  kept = []
+  for det in detections:
+    center = sum(float(p[1]) for p in det["box"]) / len(det["box"])
+    if not y0 <= center <= y1:
+      kept.append(det)
+  return blanked, kept
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument("--output-dir", default=None)
+  parser.add_argument("--char-error", default="0,0.01,0.03", help="Laju salah baca OCR per karakter, pisahkan dengan koma.")
+  parser.add_argument("--reocr", action="store_true", help="Baca ulang tiap variasi foto dengan PaddleOCR.")
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  settings = Settings()
+  output_dir = Path(args.output_dir or settings.output_dir)
+  max_distance = settings.duplicate_max_distance
+  min_similarity = settings.duplicate_min_text_similarity
+  char_errors = [float(rate) for rate in args.char_error.split(",") if rate.strip()]
+  rng = random.Random(args.seed)
+  ocr = None
+  if args.reocr:
+    from app.services.ocr_service import get_ocr_service
+
+    ocr = get_ocr_service(settings)
+
+  pages = []
+  for image_path in sorted(output_dir.glob("annotated_*.jpg")):
+    json_path = image_path.with_suffix(".json")
+    if json_path.exists():
+      detections = json.loads(json_path.read_text(encoding="utf-8"))
+      image = Image.open(image_path)
+      pages.append((image_path.stem, image, detections, dhash(_jpeg(image))))
+
+  rephoto_groups = ["re-photo ocr"] if ocr is not None else [f"re-photo cer={rate:g}" for rate in char_errors]
+  # Each sample: (hash distance, confirmed by OCR text, parsed transactions differ, amounts equal)
+  groups: Dict[str, List[Tuple[int, bool, bool, Optional[bool]]]] = {
+    **{name: [] for name in rephoto_groups},
+    "same layout": [],
+    "other page": [],
+  }
+  for stem, image, detections, base in pages:
+    lines = [det["text"] for det in detections]
+    rows = _transactions(detections)
+    for variant in _rephotos(image):
+      variant_bytes = _jpeg(variant)
+      distance = hamming(base, dhash(variant_bytes))
+      if ocr is not None:
+        readings = [("re-photo ocr", ocr.extract(variant_bytes).lines)]
+      else:
+        readings = [(f"re-photo cer={rate:g}", _ocr_noise(lines, rng, rate)) for rate in char_errors]
+      for name, variant_lines in readings:
+        # With a zero threshold `same_page` only checks that the amounts agree.
+        groups[name].append(
+          (distance, same_page(lines, variant_lines, min_similarity), False, same_page(lines, variant_lines, 0.0))
+        )
+    for top in (0.3, 0.4, 0.5, 0.6, 0.7):
+      blanked, kept = _blank_band(image, detections, top)
+      if len(kept) == len(detections):
+        continue  # empty band: still the same page
+      kept_lines = [det["text"] for det in kept]
+      groups["same layout"].append(
+        (hamming(base, dhash(_jpeg(blanked))), same_page(lines, kept_lines, min_similarity), _transactions(kept) != rows, None)
+      )
+    for other_stem, _, other_detections, other_hash in pages:
+      other_lines = [det["text"] for det in other_detections]
+      if other_stem != stem and other_lines != lines:
+        groups["other page"].append(
+          (
+            hamming(base, other_hash),
+            same_page(lines, other_lines, min_similarity),
+            _transactions(other_detections) != rows,
+            None,
+          )
+        )
+
+  print(f"{len(pages)} halaman, DUPLICATE_MAX_DISTANCE={max_distance}, DUPLICATE_MIN_TEXT_SIMILARITY={min_similarity}")
+  for name, samples in groups.items():
+    if not samples:
+      continue
+    distances = sorted(sample[0] for sample in samples)
+    near = sum(sample[0] <= max_distance for sample in samples)
+    accepted = [differs for distance, confirmed, differs, _ in samples if distance <= max_distance and confirmed]
+    amounts = [same for _, _, _, same in samples if same is not None]
+    print(
+      f"{name:18} n={len(samples):3} jarak {distances[0]}-{distances[-1]} "
+      f"kandidat {near}/{len(samples)} diterima {len(accepted)}/{len(samples)} "
+      f"({len(accepted) / len(samples):.0%}, transaksi berbeda {sum(accepted)})"
+      + (f" nominal sama {sum(amounts)}/{len(amounts)}" if amounts else "")
+    )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,322 @@
+"""
+Re-run parsing over persisted OCR detections and refresh the Transaction table.
+
+Streams the detection JSON files written by ScanService from OUTPUT_DIR through the
+current layout + rule-based parser in worker processes. Each scan is diffed against the
+rows it returned (its `<stem>.parsed.json` in RECORDS_DIR); the record is updated and, if
+the scan already has rows in the Transaction table (keyed by `scan_id` = file stem, owned
+by the scan's `phone`), those rows are replaced. Scans missing from the table are only
+inserted with --insert-new. OCR is not re-run.
+
+Scans from before parsed records existed are parsed too and reported separately, so a
+dry run shows the parser's throughput on the whole history, but they have no known owner
+and are never written. Skipped scans: no owner (`phone`), duplicates of another scan,
+and, unless --llm is given, scans whose stored rows came from Groq. With --llm those
+scans are re-normalised through GroqService under a concurrency and requests-per-minute
+cap.
+
+Usage (from the repo root):
+  python -m scripts.reparse_detections [--output-dir output] [--workers 4] [--llm] [--insert-new] [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import Settings
+from app.domain.models import OcrResult, ParsedRecord, ParsedRow
+from app.services.groq_service import GroqService
+from app.services.layout_service import build_layout
+from app.services.parsing_service import parse_layout_rule_based
+from app.services.scan_store import PARSED_SUFFIX, parsed_record_path, read_parsed_record, write_parsed_record
+from db.init_db import CREATE_TABLE_SQL, DB_PATH, ensure_phone_column, ensure_scan_id_column
+
+ROW_FIELDS = ("date", "item", "qty", "unit", "price", "total", "type")
+
+RowKey = Tuple
+# (detection path, row lines for the LLM, rule-based rows, error)
+ParseOutcome = Tuple[str, List[str], Optional[List[dict]], Optional[str]]
+# A detection file and its parsed record (None for scans from before records existed)
+Scan = Tuple[Path, Optional[ParsedRecord]]
+
+
+def iter_scans(output_dir: str, records_dir: str, use_llm: bool, totals: Counter) -> Iterator[Scan]:
+  """
+  Yield detection files that may be re-parsed with their parsed record, read once here,
+  counting why the others are skipped.
+  """
+  for path in sorted(Path(output_dir).glob("*.json")):
+    if not path.is_file() or path.name.endswith(PARSED_SUFFIX):
+      continue
+    record = read_parsed_record(parsed_record_path(records_dir, path.stem))
+    if record is None:
+      yield path, None
+    elif not record.phone:
+      totals["skipped_no_owner"] += 1
+    elif record.duplicate_of:
+      totals["skipped_duplicate"] += 1
+    elif record.used_llm and not use_llm:
+      totals["skipped_groq"] += 1
+    else:
+      yield path, record
+
+
+def reparse_file(path: str) -> ParseOutcome:
+  """
+  Parse one detection file with the rule-based parser. Runs in a worker process.
+  """
+  try:
+    detections = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(detections, list):
+      raise ValueError("bukan daftar deteksi")
+    ocr_result = OcrResult(
+      lines=[det["text"] for det in detections],
+      boxes=[det["box"] for det in detections],
+      scores=[det["score"] for det in detections],
+    )
+    layout = build_layout(ocr_result)
+    parsed = parse_layout_rule_based(layout)
+  except Exception as exc:
+    return path, [], None, f"{exc.__class__.__name__}: {exc}"
+
+  return path, layout.lines or ocr_result.lines, [row.model_dump() for row in parsed], None
+
+
+def reparse(scans: Iterable[Scan], workers: int, max_in_flight: int) -> Iterator[Tuple[ParseOutcome, Optional[ParsedRecord]]]:
+  """
+  Yield (outcome, record) as workers finish, keeping at most `max_in_flight` files (and
+  their records) queued so memory stays bounded regardless of how many files exist.
+  """
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    pending: Dict[Future, Optional[ParsedRecord]] = {}
+    for path, record in scans:
+      pending[pool.submit(reparse_file, str(path))] = record
+      if len(pending) >= max_in_flight:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          yield future.result(), pending.pop(future)
+    for future, record in pending.items():
+      yield future.result(), record
+
+
+class GroqLimiter:
+  """
+  Caps concurrent Groq calls and spaces request starts to at most `rpm` per minute.
+  """
+
+  def __init__(self, groq: GroqService, concurrency: int, rpm: float) -> None:
+    self._groq = groq
+    self._semaphore = asyncio.Semaphore(max(1, concurrency))
+    self._interval = 60.0 / rpm if rpm > 0 else 0.0
+    self._next_start = 0.0
+    self._lock = asyncio.Lock()
+
+  async def normalize(self, lines: List[str]) -> List[ParsedRow]:
+    async with self._semaphore:
+      async with self._lock:
+        now = time.monotonic()
+        delay = self._next_start - now
+        self._next_start = max(now, self._next_start) + self._interval
+      if delay > 0:
+        await asyncio.sleep(delay)
+      return await self._groq.normalize(lines)
+
+
+async def _normalize_batch(
+  limiter: GroqLimiter, batch: List[Tuple[ParseOutcome, ParsedRecord]]
+) -> List[Optional[List[ParsedRow]]]:
+  async def one(lines: List[str]) -> Optional[List[ParsedRow]]:
+    try:
+      return await limiter.normalize(lines) or None
+    except Exception as exc:
+      print(f"[groq gagal] {exc}")
+      return None
+
+  return await asyncio.gather(*(one(outcome[1]) for outcome, _ in batch))
+
+
+def _row_key(row: ParsedRow) -> RowKey:
+  return tuple(getattr(row, name) for name in ROW_FIELDS)
+
+
+def _diff(previous: List[RowKey], current: List[RowKey]) -> Dict[str, int]:
+  old, new = Counter(previous), Counter(current)
+  unchanged = sum((old & new).values())
+  return {
+    "unchanged": unchanged,
+    "added": sum(new.values()) - unchanged,
+    "removed": sum(old.values()) - unchanged,
+  }
+
+
+def _replace_rows(conn: sqlite3.Connection, record: ParsedRecord, rows: List[ParsedRow]) -> None:
+  conn.execute('DELETE FROM "Transaction" WHERE scan_id = ?', (record.scan_id,))
+  placeholders = ", ".join("?" * (len(ROW_FIELDS) + 2))
+  conn.executemany(
+    f'INSERT INTO "Transaction" ({", ".join(ROW_FIELDS)}, phone, scan_id) VALUES ({placeholders})',
+    [(*_row_key(row), record.phone, record.scan_id) for row in rows],
+  )
+
+
+def _stored_scan_ids(conn: sqlite3.Connection) -> Set[str]:
+  return {scan_id for (scan_id,) in conn.execute('SELECT DISTINCT scan_id FROM "Transaction" WHERE scan_id != \'\'')}
+
+
+def _apply(
+  record: Optional[ParsedRecord],
+  rows: Optional[List[ParsedRow]],
+  used_llm: bool,
+  records_dir: str,
+  conn: Optional[sqlite3.Connection],
+  stored: Set[str],
+  insert_new: bool,
+  dry_run: bool,
+  totals: Counter,
+) -> None:
+  if rows is None:
+    # Groq was required but failed: keep what the owner already has.
+    totals["failed"] += 1
+    return
+
+  totals["rows"] += len(rows)
+  if record is None:
+    # No record means no known owner and nothing to diff against: count only.
+    totals["unrecorded"] += 1
+    totals["unrecorded_rows"] += len(rows)
+    return
+
+  diff = _diff([_row_key(row) for row in record.rows], [_row_key(row) for row in rows])
+  totals.update(diff)
+  changed = diff["added"] > 0 or diff["removed"] > 0
+  totals["files_changed"] += int(changed)
+  if dry_run:
+    return
+
+  if changed:
+    write_parsed_record(records_dir, record.scan_id, record.phone, rows, used_llm, record.duplicate_of)
+  if record.scan_id in stored:
+    _replace_rows(conn, record, rows)
+  elif insert_new:
+    _replace_rows(conn, record, rows)
+    stored.add(record.scan_id)
+    totals["db_inserted"] += 1
+  else:
+    totals["db_not_stored"] += 1
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument("--output-dir", default=None, help="Folder deteksi (default: OUTPUT_DIR).")
+  parser.add_argument("--records-dir", default=None, help="Folder hasil parsing (default: RECORDS_DIR).")
+  parser.add_argument("--db", default=str(DB_PATH))
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+  parser.add_argument("--commit-every", type=int, default=200, help="0 = commit sekali di akhir.")
+  parser.add_argument("--llm", action="store_true", help="Normalisasi ulang scan Groq lewat Groq.")
+  parser.add_argument("--llm-concurrency", type=int, default=2)
+  parser.add_argument("--llm-rpm", type=float, default=30, help="Batas request Groq per menit.")
+  parser.add_argument(
+    "--insert-new", action="store_true", help="Tulis juga scan yang belum ada di tabel Transaction."
+  )
+  parser.add_argument("--dry-run", action="store_true", help="Hitung diff tanpa menulis file maupun database.")
+  args = parser.parse_args()
+
+  settings = Settings()
+  output_dir = args.output_dir or settings.output_dir
+  records_dir = args.records_dir or settings.records_dir
+  workers = max(1, args.workers)
+
+  limiter = None
+  if args.llm:
+    if not settings.groq_api_key:
+      parser.error("--llm membutuhkan GROQ_API_KEY.")
+    limiter = GroqLimiter(GroqService(settings), args.llm_concurrency, args.llm_rpm)
+
+  # A dry run only reads the parsed records; the database is not opened at all.
+  conn = None
+  stored: Set[str] = set()
+  if not args.dry_run:
+    conn = sqlite3.connect(args.db)
+    conn.execute(CREATE_TABLE_SQL)
+    ensure_phone_column(conn)
+    ensure_scan_id_column(conn)
+    stored = _stored_scan_ids(conn)
+
+  totals = Counter()
+  llm_batch: List[Tuple[ParseOutcome, ParsedRecord]] = []
+  loop = asyncio.new_event_loop()
+
+  def apply(record: Optional[ParsedRecord], rows: Optional[List[ParsedRow]], used_llm: bool) -> None:
+    _apply(record, rows, used_llm, records_dir, conn, stored, args.insert_new, args.dry_run, totals)
+
+  def flush_llm() -> None:
+    results = loop.run_until_complete(_normalize_batch(limiter, llm_batch))
+    for (_, record), rows in zip(llm_batch, results):
+      if rows is not None:
+        rows = [row.copy(update={"source": "groq"}) for row in rows]
+      apply(record, rows, True)
+    llm_batch.clear()
+
+  started = time.perf_counter()
+  try:
+    scans = iter_scans(output_dir, records_dir, args.llm, totals)
+    for outcome, record in reparse(scans, workers=workers, max_in_flight=workers * 4):
+      path, _, rule_rows, error = outcome
+      totals["files"] += 1
+      if error is not None:
+        totals["failed"] += 1
+        print(f"[gagal] {Path(path).stem}: {error}")
+        continue
+
+      if limiter is not None and record is not None and (record.used_llm or not rule_rows):
+        llm_batch.append((outcome, record))
+        if len(llm_batch) >= args.llm_concurrency * 4:
+          flush_llm()
+      else:
+        apply(record, [ParsedRow(**row) for row in rule_rows], False)
+
+      if conn is not None and args.commit_every > 0 and totals["files"] % args.commit_every == 0:
+        conn.commit()
+
+    if llm_batch:
+      flush_llm()
+    if conn is not None:
+      conn.commit()
+  finally:
+    loop.close()
+    if conn is not None:
+      conn.close()
+
+  elapsed = time.perf_counter() - started
+  rate = elapsed if elapsed > 0 else 1e-9
+  print(
+    f"{totals['files']} file ({totals['failed']} gagal), {totals['rows']} baris dalam {elapsed:.2f}s "
+    f"({totals['files'] / rate:.1f} file/s, {totals['rows'] / rate:.1f} baris/s)"
+  )
+  print(
+    f"dilewati: {totals['skipped_no_owner']} tanpa pemilik, {totals['skipped_duplicate']} duplikat, "
+    f"{totals['skipped_groq']} hasil Groq (pakai --llm)"
+  )
+  print(
+    f"tanpa rekaman parsing: {totals['unrecorded']} file, {totals['unrecorded_rows']} baris "
+    "(hanya dihitung, tidak ditulis)"
+  )
+  print(
+    f"diff: {totals['files_changed']} file berubah, +{totals['added']} baris, "
+    f"-{totals['removed']} baris, {totals['unchanged']} tetap"
+    + (" (dry run)" if args.dry_run else "")
+  )
+  if not args.dry_run:
+    print(
+      f"database: {totals['db_inserted']} scan baru ditulis, {totals['db_not_stored']} scan belum ada di tabel "
+      "dilewati (pakai --insert-new)"
+    )
+
+
+if __name__ == "__main__":
+  main()